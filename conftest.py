@@ -0,0 +1 @@
+"""Lets a plain `pytest` run from the repo root import find_cycles."""
@@ -0,0 +1,258 @@
+"""
+Numba kernels for `find_cycles.find_all_cycles` on very large graphs.
+
+Imported by find_cycles only once a graph is big enough to need it, so the
+numba and numpy import cost is not paid on ordinary runs.
+"""
+
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def _jit_grow(arr, size):
+    """Return `arr` copied into a buffer that holds at least `size` items."""
+    out = np.empty(max(size, 2 * arr.size), arr.dtype)
+    out[:arr.size] = arr
+    return out
+
+
+@numba.njit(cache=True)
+def _jit_split(indptr, indices, members, n_members, comp, old_label, next_label,
+               cyclic, index, lowlink, on_stack, scc_stack, call_node, call_pos):
+    """
+    Split the nodes `members[:n_members]`, all labelled `old_label` in
+    `comp`, into strongly connected components (Tarjan).
+
+    Each new component gets a fresh label from `next_label` upwards, and
+    `cyclic[v]` is set for nodes whose component holds a cycle. The
+    scratch arrays are shared between calls and must start out cleared
+    (`index` at -1); only the entries for `members` are touched and
+    cleared again, so the cost does not depend on the graph size.
+    Returns the next unused label.
+    """
+    sp = 0
+    counter = 0
+
+    for k in range(n_members):
+        root = members[k]
+        if index[root] >= 0:
+            continue
+
+        index[root] = counter
+        lowlink[root] = counter
+        counter += 1
+        scc_stack[sp] = root
+        sp += 1
+        on_stack[root] = 1
+        call_node[0] = root
+        call_pos[0] = indptr[root]
+        depth = 1
+
+        while depth > 0:
+            node = call_node[depth - 1]
+            p = call_pos[depth - 1]
+
+            if p < indptr[node + 1]:
+                call_pos[depth - 1] = p + 1
+                neighbour = indices[p]
+                if comp[neighbour] != old_label:
+                    continue
+                if index[neighbour] < 0:
+                    index[neighbour] = counter
+                    lowlink[neighbour] = counter
+                    counter += 1
+                    scc_stack[sp] = neighbour
+                    sp += 1
+                    on_stack[neighbour] = 1
+                    call_node[depth] = neighbour
+                    call_pos[depth] = indptr[neighbour]
+                    depth += 1
+                elif on_stack[neighbour] and index[neighbour] < lowlink[node]:
+                    lowlink[node] = index[neighbour]
+                continue
+
+            depth -= 1
+            if depth > 0:
+                parent = call_node[depth - 1]
+                if lowlink[node] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node]
+            if lowlink[node] == index[node]:
+                top = sp
+                while True:
+                    sp -= 1
+                    on_stack[scc_stack[sp]] = 0
+                    if scc_stack[sp] == node:
+                        break
+                has_cycle = top - sp > 1
+                if not has_cycle:
+                    for q in range(indptr[node], indptr[node + 1]):
+                        if indices[q] == node:
+                            has_cycle = True
+                            break
+                # Relabelling takes these nodes out of the split; later
+                # edges into them are skipped, which is what Tarjan does
+                # for finished components anyway.
+                for j in range(sp, top):
+                    comp[scc_stack[j]] = next_label
+                    cyclic[scc_stack[j]] = 1 if has_cycle else 0
+                next_label += 1
+
+    for k in range(n_members):
+        index[members[k]] = -1
+    return next_label
+
+
+@numba.njit(cache=True)
+def _jit_johnson(indptr, indices):
+    """
+    Johnson's algorithm over a CSR graph with sorted rows.
+
+    Returns `(flat, lengths)`: all cycles concatenated into one buffer,
+    plus the length of each cycle in order.
+    """
+    n = indptr.size - 1
+    comp = np.zeros(n, np.int64)
+    cyclic = np.zeros(n, np.uint8)
+    index = np.full(n, -1, np.int64)
+    lowlink = np.zeros(n, np.int64)
+    on_stack = np.zeros(n, np.uint8)
+    scc_stack = np.empty(n, np.int32)
+    call_node = np.empty(n, np.int32)
+    call_pos = np.empty(n, np.int64)
+    members = np.arange(n).astype(np.int32)
+    blocked = np.zeros(n, np.uint8)
+    # blocked_by lists are linked lists in a shared pool: head[v] is the
+    # first entry for v, pool_next chains entries, pool_node holds values.
+    head = np.full(n, -1, np.int64)
+    pool_next = np.empty(indices.size + 1, np.int64)
+    pool_node = np.empty(indices.size + 1, np.int32)
+    pending = np.empty(indices.size + 2, np.int32)
+    # The search stack is also the current path.
+    stack_node = np.empty(n, np.int32)
+    stack_pos = np.empty(n, np.int64)
+    found = np.zeros(n, np.uint8)
+    flat = np.empty(64, np.int32)
+    lengths = np.empty(16, np.int64)
+    flat_size = 0
+    n_cycles = 0
+
+    next_label = _jit_split(indptr, indices, members, n, comp, 0, 1, cyclic,
+                            index, lowlink, on_stack, scc_stack, call_node, call_pos)
+
+    # Components only ever split into nodes above the current start, so
+    # walking start nodes upwards visits them smallest-first.
+    for start in range(n):
+        if not cyclic[start]:
+            continue
+
+        label = comp[start]
+        n_members = 0
+        for v in range(start, n):
+            if comp[v] == label:
+                blocked[v] = 0
+                head[v] = -1
+                if v != start:
+                    members[n_members] = v
+                    n_members += 1
+        pool_size = 0
+
+        stack_node[0] = start
+        stack_pos[0] = indptr[start]
+        found[0] = 0
+        depth = 1
+        blocked[start] = 1
+
+        while depth > 0:
+            node = stack_node[depth - 1]
+            p = stack_pos[depth - 1]
+
+            if p < indptr[node + 1]:
+                stack_pos[depth - 1] = p + 1
+                neighbour = indices[p]
+                if comp[neighbour] != label:
+                    continue
+                if neighbour == start:
+                    if flat_size + depth > flat.size:
+                        flat = _jit_grow(flat, flat_size + depth)
+                    flat[flat_size:flat_size + depth] = stack_node[:depth]
+                    flat_size += depth
+                    if n_cycles == lengths.size:
+                        lengths = _jit_grow(lengths, n_cycles + 1)
+                    lengths[n_cycles] = depth
+                    n_cycles += 1
+                    found[depth - 1] = 1
+                elif blocked[neighbour] == 0:
+                    blocked[neighbour] = 1
+                    stack_node[depth] = neighbour
+                    stack_pos[depth] = indptr[neighbour]
+                    found[depth] = 0
+                    depth += 1
+                continue
+
+            depth -= 1
+            if found[depth]:
+                # Unblock `node` and, transitively, everything waiting on it.
+                pending[0] = node
+                todo = 1
+                while todo > 0:
+                    todo -= 1
+                    u = pending[todo]
+                    if blocked[u]:
+                        blocked[u] = 0
+                        q = head[u]
+                        while q >= 0:
+                            pending[todo] = pool_node[q]
+                            todo += 1
+                            q = pool_next[q]
+                        head[u] = -1
+                if depth > 0:
+                    found[depth - 1] = 1
+            else:
+                for q in range(indptr[node], indptr[node + 1]):
+                    neighbour = indices[q]
+                    if comp[neighbour] != label:
+                        continue
+                    if pool_size == pool_node.size:
+                        pool_node = _jit_grow(pool_node, pool_size + 1)
+                        pool_next = _jit_grow(pool_next, pool_size + 1)
+                        pending = _jit_grow(pending, pool_size + 2)
+                    pool_node[pool_size] = node
+                    pool_next[pool_size] = head[neighbour]
+                    head[neighbour] = pool_size
+                    pool_size += 1
+
+        # Drop `start` and split the rest of its component again.
+        comp[start] = -1
+        cyclic[start] = 0
+        next_label = _jit_split(indptr, indices, members, n_members, comp, label,
+                                next_label, cyclic, index, lowlink, on_stack,
+                                scc_stack, call_node, call_pos)
+
+    return flat[:flat_size], lengths[:n_cycles]
+
+
+def find_all_cycles_jit(adj):
+    """
+    Find every elementary cycle of `adj`, exactly as `find_all_cycles` does.
+
+    `adj` is copied into CSR arrays for the kernel. Every row of `adj` must already be sorted, as `_component_adjacency`
+    returns them; the kernel relies on that to visit nodes in id order.
+    """
+    indptr = np.zeros(len(adj) + 1, np.int64)
+    np.cumsum([len(neighbours) for neighbours in adj], out=indptr[1:])
+    indices = np.fromiter(
+        (w for neighbours in adj for w in neighbours),
+        np.int32,
+        count=int(indptr[-1]),
+    )
+
+    flat, lengths = _jit_johnson(indptr, indices)
+
+    cycles = []
+    flat = flat.tolist()
+    pos = 0
+    for length in lengths.tolist():
+        cycles.append(flat[pos:pos + length])
+        pos += length
+    return cycles
@@ -0,0 +1,257 @@
+"""Tests for the cycle search and graph building in find_cycles.py."""
+
+import os
+import random
+import re
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import openpyxl
+
+import find_cycles
+
+
+def save_workbook(directory, sheets, name="deps.xlsx"):
+    """Write `{sheet_name: rows}` to an .xlsx file and return its path."""
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for sheet_name, rows in sheets.items():
+        sheet = workbook.create_sheet(sheet_name)
+        for row in rows:
+            sheet.append(row)
+    path = os.path.join(directory, name)
+    workbook.save(path)
+    return path
+
+
+def claim_a1_dimension(path):
+    """Rewrite every sheet's saved dimension to "A1:A1", as some tools do."""
+    with zipfile.ZipFile(path) as archive:
+        parts = {info: archive.read(info) for info in archive.infolist()}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for info, data in parts.items():
+            if info.filename.startswith("xl/worksheets/"):
+                data = re.sub(rb'<dimension ref="[^"]*" ?/>', b'<dimension ref="A1:A1"/>', data)
+            archive.writestr(info, data)
+
+
+def brute_force_cycles(adj):
+    """Every elementary cycle, as a tuple starting at its smallest node."""
+    found = set()
+
+    def extend(start, path, on_path):
+        for neighbour in adj[path[-1]]:
+            if neighbour == start:
+                found.add(tuple(path))
+            elif neighbour > start and neighbour not in on_path:
+                on_path.add(neighbour)
+                path.append(neighbour)
+                extend(start, path, on_path)
+                path.pop()
+                on_path.discard(neighbour)
+
+    for start in range(len(adj)):
+        extend(start, [start], {start})
+    return found
+
+
+def random_graphs(count, seed=0):
+    """Small random directed graphs, including self-loops and isolated nodes."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        n = rng.randint(1, 9)
+        adj = [[] for _ in range(n)]
+        for _ in range(rng.randint(0, 3 * n)):
+            a, b = rng.randrange(n), rng.randrange(n)
+            if b not in adj[a]:
+                adj[a].append(b)
+        yield adj
+
+
+class FindAllCyclesTest(unittest.TestCase):
+
+    def assert_elementary_cycles(self, adj, cycles):
+        as_tuples = [tuple(cycle) for cycle in cycles]
+        self.assertEqual(len(as_tuples), len(set(as_tuples)), "cycle reported twice")
+        self.assertEqual(set(as_tuples), brute_force_cycles(adj))
+
+    def test_matches_brute_force(self):
+        for adj in random_graphs(500):
+            self.assert_elementary_cycles(adj, find_cycles.find_all_cycles(adj))
+
+    def test_acyclic_graph(self):
+        # Diamond: shared dependency but no cycle.
+        self.assertEqual(find_cycles.find_all_cycles([[1, 2], [3], [3], []]), [])
+
+    def test_self_loop(self):
+        self.assertEqual(find_cycles.find_all_cycles([[0], []]), [[0]])
+
+    def test_cycles_start_at_smallest_node_in_order(self):
+        adj = [[1], [0], [3], [4], [2]]
+        self.assertEqual(find_cycles.find_all_cycles(adj), [[0, 1], [2, 3, 4]])
+
+    def test_long_chain_does_not_recurse(self):
+        n = 20000
+        adj = [[i + 1] for i in range(n - 1)] + [[0]]
+        self.assertEqual(find_cycles.find_all_cycles(adj), [list(range(n))])
+
+
+@unittest.skipUnless(find_cycles.HAVE_NUMBA, "numba is not installed")
+class JitCyclesTest(unittest.TestCase):
+
+    def test_matches_python_search(self):
+        for adj in random_graphs(500, seed=1):
+            adj = [sorted(neighbours) for neighbours in adj]
+            expected = find_cycles.find_all_cycles(adj)
+            self.assertEqual(find_cycles._find_all_cycles_jit(adj), expected)
+            self.assertEqual({tuple(c) for c in expected}, brute_force_cycles(adj))
+
+    def test_find_all_cycles_maps_kernel_ids_back(self):
+        # Node 0 and the sink 5 are outside every cycle, so the kernel sees
+        # a renumbered subgraph.
+        adj = [[1], [2], [1], [4], [3, 5], []]
+        with mock.patch.object(find_cycles, "JIT_MIN_EDGES", 0):
+            self.assertEqual(find_cycles.find_all_cycles(adj), [[1, 2], [3, 4]])
+
+
+class BuildGraphFromRowsTest(unittest.TestCase):
+
+    def test_edges_and_origins(self):
+        graph, edge_origins = find_cycles.build_graph_from_rows([
+            ("A", "B", "One"),
+            ("A", "B", "Two"),
+            ("A", "B", "Two"),
+            ("B", "C", "One"),
+        ])
+        self.assertEqual(list(graph), ["A", "B", "C"])
+        self.assertEqual(graph["A"], {"B"})
+        self.assertEqual(graph["C"], set())
+        self.assertEqual(edge_origins[("A", "B")], {"One", "Two"})
+        self.assertEqual(edge_origins[("B", "C")], {"One"})
+
+    def test_non_string_values(self):
+        graph, edge_origins = find_cycles.build_graph_from_rows([(1, 2, "S"), (2, 1, "S")])
+        self.assertEqual(dict(graph), {"1": {"2"}, "2": {"1"}})
+        self.assertEqual(edge_origins[("2", "1")], {"S"})
+
+    def test_cycles_from_rows(self):
+        graph, _ = find_cycles.build_graph_from_rows([
+            ("Task A", "Task B", "S"),
+            ("Task B", "Task A", "S"),
+            ("Task C", "Task A", "S"),
+        ])
+        nodes, adj = find_cycles.index_graph(graph)
+        cycles = [[nodes[i] for i in cycle] for cycle in find_cycles.find_all_cycles(adj)]
+        self.assertEqual(cycles, [["Task A", "Task B"]])
+
+
+class ReadSheetTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def read(self, rows, source_col="Task", target_col="Depends On", separator=None):
+        path = save_workbook(self.directory, {"S": rows})
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            sheet = find_cycles.get_sheet(workbook, "S")
+            return list(find_cycles.read_sheet(sheet, source_col, target_col, separator))
+        finally:
+            workbook.close()
+
+    def test_single_target_per_cell(self):
+        pairs = self.read([["Task", "Depends On"], ["A", "B"], [" B ", " C "]], separator=",")
+        self.assertEqual(pairs, [("A", "B"), ("B", "C")])
+
+    def test_separator_splits_and_drops_empty_parts(self):
+        pairs = self.read([["Task", "Depends On"], ["A", " ,B, "], ["C", "D;E"]], separator=",")
+        self.assertEqual(pairs, [("A", "B"), ("C", "D;E")])
+
+    def test_newline_separator(self):
+        pairs = self.read([["Task", "Depends On"], ["A", "B\nC\n"]], separator="\n")
+        self.assertEqual(pairs, [("A", "B"), ("A", "C")])
+
+    def test_headers_are_case_insensitive_and_first_duplicate_wins(self):
+        pairs = self.read(
+            [[" task ", "DEPENDS ON", "Depends On"], ["A", "B", "X"]],
+            source_col="Task", target_col="depends on",
+        )
+        self.assertEqual(pairs, [("A", "B")])
+
+    def test_missing_column_yields_nothing(self):
+        self.assertEqual(self.read([["Task", "Other"], ["A", "B"]]), [])
+
+    def test_blank_and_short_rows_are_skipped(self):
+        # max_col pads short rows with None, so a missing target cell is
+        # just a blank one.
+        pairs = self.read([
+            ["Depends On", "Notes", "Task"],
+            ["B", None, "A"],
+            ["   ", None, "C"],
+            ["D", None, "  "],
+            ["E"],
+            [None, "note", "F"],
+        ])
+        self.assertEqual(pairs, [("A", "B")])
+
+    def test_numeric_ids(self):
+        pairs = self.read([["Task", "Depends On"], [1, 1.5], [2, "3"]])
+        self.assertEqual(pairs, [("1", "1.5"), ("2", "3")])
+
+    def test_norm(self):
+        self.assertIsNone(find_cycles._norm("  "))
+        self.assertEqual(find_cycles._norm(" A "), "A")
+        self.assertEqual(find_cycles._norm(7), "7")
+        self.assertEqual(find_cycles._norm(0), "0")
+
+    def test_bogus_a1_dimension_is_reset(self):
+        path = save_workbook(self.directory, {
+            "S": [["Task", "Depends On"], ["A", "B"], ["B", "A"]],
+        })
+        claim_a1_dimension(path)
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            self.assertEqual(workbook["S"].max_column, 1)
+            sheet = find_cycles.get_sheet(workbook, "S")
+            pairs = list(find_cycles.read_sheet(sheet, "Task", "Depends On", None))
+        finally:
+            workbook.close()
+        self.assertEqual(pairs, [("A", "B"), ("B", "A")])
+
+
+class RunTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def test_normal_mode_workbook_with_empty_sheet(self):
+        path = save_workbook(self.directory, {
+            "Deps": [["Task", "Depends On"], ["A", "B"], ["B", "A"]],
+            "Empty": [],
+        })
+        workbook = openpyxl.load_workbook(path)
+        _, edge_origins, cycles = find_cycles.run(workbook, "Task", "Depends On")
+        self.assertEqual(cycles, [["A", "B"]])
+        self.assertEqual(edge_origins[("B", "A")], {"Deps"})
+
+    def test_path_across_sheets(self):
+        path = save_workbook(self.directory, {
+            "One": [["Task", "Depends On"], ["A", "B, C"]],
+            "Two": [["depends on", "task"], ["A", "B"], ["A", "C"]],
+            "Other": [["Name", "Value"], ["x", "y"]],
+        })
+        graph, edge_origins, cycles = find_cycles.run(path, "Task", "Depends On", ",")
+        self.assertEqual(dict(graph), {"A": {"B", "C"}, "B": {"A"}, "C": {"A"}})
+        self.assertEqual(edge_origins[("A", "B")], {"One"})
+        self.assertEqual(edge_origins[("B", "A")], {"Two"})
+        self.assertEqual(cycles, [["A", "B"], ["A", "C"]])
+
+
+if __name__ == "__main__":
+    unittest.main()